@@ -0,0 +1,66 @@
+"""
+Compare accounts snapshot compressions: file size, compression ratio and load / save time.
+
+Usage: python -m benchmarks.snapshot_compression --sizes 10000 100000 1000000
+"""
+
+import argparse
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.accounts import models, snapshot
+
+
+def create_accounts(count: int) -> models.AccountsMap:
+    accounts = {}
+    for idx in range(count):
+        account = models.Account(id=uuid.uuid4(), username=f"user_{idx}", balance=Decimal(idx) / 100)
+        accounts[account.id] = account
+    return models.AccountsMap.model_construct(accounts)
+
+
+def measure(filepath: Path, accounts: models.AccountsMap, compression: snapshot.SnapshotCompression):
+    start = time.perf_counter()
+    with filepath.open("wb") as file:
+        snapshot.write_snapshot(file, accounts, compression)
+    save_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with filepath.open("rb") as file:
+        loaded = snapshot.read_snapshot(file)
+    load_time = time.perf_counter() - start
+
+    assert len(loaded.root) == len(accounts.root)
+    return filepath.stat().st_size, save_time, load_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    compressions = [c for c in snapshot.SnapshotCompression]
+    if snapshot.zstandard is None:
+        compressions.remove(snapshot.SnapshotCompression.ZSTD)
+        print("zstandard is not installed, skipping zstd")
+
+    print(f"{'accounts':>10} {'compression':>12} {'size [B]':>14} {'ratio':>7} {'save [s]':>9} {'load [s]':>9}")
+    with TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            accounts = create_accounts(size)
+            baseline = None
+            for compression in compressions:
+                filepath = Path(tmpdir) / f"accounts_{compression}.json"
+                file_size, save_time, load_time = measure(filepath, accounts, compression)
+                baseline = baseline or file_size
+                print(
+                    f"{size:>10} {compression:>12} {file_size:>14} {baseline / file_size:>7.2f}"
+                    f" {save_time:>9.3f} {load_time:>9.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import csv
+import io
+from enum import StrEnum
+from itertools import batched
+from typing import BinaryIO, Iterable, Iterator, NamedTuple
+
+from pydantic import ValidationError
+
+from src.accounts import models
+
+CSV_FIELDS = ("id", "username", "balance")
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_IMPORT_ERRORS = 100
+
+
+class BulkFormat(StrEnum):
+    """Formats supported by bulk import and export of accounts."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return {BulkFormat.NDJSON: "application/x-ndjson", BulkFormat.CSV: "text/csv"}[self]
+
+
+class ParsedRecord(NamedTuple):
+    """Single line of a bulk import, either a valid account or an error message."""
+
+    line: int
+    account: models.Account | None = None
+    error: str | None = None
+
+
+def _validation_error_message(err: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in e['loc']) or 'line'}: {e['msg']}" for e in err.errors())
+
+
+def parse_ndjson(file: BinaryIO) -> Iterator[ParsedRecord]:
+    """Lazily parse and validate accounts from a newline delimited JSON stream, skipping blank lines."""
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield ParsedRecord(line_number, account=models.Account.model_validate_json(line))
+        except ValidationError as err:
+            yield ParsedRecord(line_number, error=_validation_error_message(err))
+
+
+def parse_csv(file: BinaryIO) -> Iterator[ParsedRecord]:
+    """
+    Lazily parse and validate accounts from a CSV stream with a header row, `id` column is optional.
+
+    Lines which are not valid UTF-8 or CSV are reported as errors, and parsing continues with the next line.
+    """
+    undecodable: list[ParsedRecord] = []
+    last_line = 0
+
+    def decode_lines() -> Iterator[str]:
+        nonlocal last_line
+        for last_line, line in enumerate(file, start=1):
+            try:
+                yield line.decode("utf-8")
+            except UnicodeDecodeError as err:
+                undecodable.append(ParsedRecord(last_line, error=f"Line is not valid UTF-8: {err.reason}"))
+                yield "\n"  # Blank line is skipped by the reader, and keeps its line numbers in sync with the file
+
+    reader = csv.DictReader(decode_lines())
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as err:
+            yield from undecodable
+            undecodable.clear()
+            yield ParsedRecord(last_line, error=str(err))
+            continue
+
+        yield from undecodable
+        undecodable.clear()
+        payload = {key: value for key, value in row.items() if key in CSV_FIELDS and value not in (None, "")}
+        try:
+            yield ParsedRecord(reader.line_num, account=models.Account.model_validate(payload))
+        except ValidationError as err:
+            yield ParsedRecord(reader.line_num, error=_validation_error_message(err))
+
+    yield from undecodable
+
+
+def parse(file: BinaryIO, fmt: BulkFormat) -> Iterator[ParsedRecord]:
+    """Parse accounts from stream using specified format."""
+    if fmt is BulkFormat.CSV:
+        return parse_csv(file)
+    return parse_ndjson(file)
+
+
+def encode_ndjson(accounts: Iterable[models.Account], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[bytes]:
+    """Encode accounts as newline delimited JSON, yielding one chunk per batch."""
+    for batch in batched(accounts, batch_size):
+        yield b"".join(account.model_dump_json().encode() + b"\n" for account in batch)
+
+
+def encode_csv(accounts: Iterable[models.Account], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[bytes]:
+    """Encode accounts as CSV with a header row, yielding one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for batch in batched(accounts, batch_size):
+        writer.writerows((str(account.id), account.username, str(account.balance)) for account in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode(
+    accounts: Iterable[models.Account], fmt: BulkFormat, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Encode accounts using specified format."""
+    if fmt is BulkFormat.CSV:
+        return encode_csv(accounts, batch_size)
+    return encode_ndjson(accounts, batch_size)
@@ -0,0 +1,211 @@
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from logging import getLogger
+from pathlib import Path
+from typing import Iterator
+from uuid import UUID
+
+from src.accounts import models
+
+logger = getLogger(__name__)
+
+SEGMENT_ENTRIES = 256
+MAX_CACHED_STATES = 10_000
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+RESOLUTION = timedelta(microseconds=1)
+
+
+@dataclass
+class _SegmentState:
+    """State of the segment new entries of an account are appended to."""
+
+    path: Path
+    size: int
+    entries: int
+    balance: Decimal
+    last_timestamp: datetime
+
+
+class AccountLedger:
+    """
+    Append-only ledger of balance changes, stored per account in time-ordered segments.
+
+    Each segment is named after timestamp of its first entry, which is a checkpoint holding balance at the time
+    the segment was started, so balance at any point in time is computed by replaying a single segment.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._states: OrderedDict[UUID, _SegmentState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _account_directory(self, account_id: UUID) -> Path:
+        return self.directory / str(account_id)
+
+    def _segments(self, account_id: UUID) -> list[Path]:
+        """List segments of an account ordered by time."""
+        directory = self._account_directory(account_id)
+        if not directory.exists():
+            return []
+        return sorted(directory.glob("*.ndjson"))
+
+    @staticmethod
+    def _segment_start(path: Path) -> datetime:
+        return EPOCH + int(path.stem) * RESOLUTION
+
+    @staticmethod
+    def _replay(path: Path) -> Iterator[models.LedgerEntry]:
+        """Read entries of a segment, filling in balance after each of them."""
+        balance = Decimal(0)
+        with path.open("r") as file:
+            for line in file:
+                if not line.endswith("\n"):
+                    break  # Entry is still being appended
+                entry = models.LedgerEntry.model_validate_json(line)
+                if entry.event is models.LedgerEvent.CHECKPOINT:
+                    balance = entry.balance
+                else:
+                    balance += entry.amount
+                    entry.balance = balance
+                yield entry
+
+    @staticmethod
+    def _repair_segment(path: Path) -> int:
+        """
+        Truncate segment to its last complete entry, dropping a write torn by a crash.
+
+        :return: Size of the segment after repair.
+        """
+        data = path.read_bytes()
+        size = data.rfind(b"\n") + 1
+        if size < len(data):
+            logger.warning(f"Dropping incomplete entry from ledger segment {path}")
+            with path.open("r+b") as file:
+                file.truncate(size)
+        return size
+
+    def _recover_state(self, account_id: UUID) -> _SegmentState | None:
+        """Restore state of the last segment of an account from file, repairing it if necessary."""
+        segments = self._segments(account_id)
+        while segments:
+            size = self._repair_segment(segments[-1])
+            if size:
+                break
+            logger.warning(f"Removing empty ledger segment {segments[-1]}")
+            segments.pop().unlink()
+        else:
+            return None
+
+        state = _SegmentState(path=segments[-1], size=size, entries=0, balance=Decimal(0), last_timestamp=EPOCH)
+        for entry in self._replay(segments[-1]):
+            state.entries += entry.event is not models.LedgerEvent.CHECKPOINT
+            state.balance = entry.balance
+            state.last_timestamp = entry.timestamp
+        return state
+
+    def _current_state(self, account_id: UUID) -> _SegmentState | None:
+        """
+        State of the segment entries of an account are appended to.
+
+        Cached state is used only while its segment is still the latest one and has the expected size, so entries
+        appended by other processes are taken into account.
+        """
+        state = self._states.get(account_id)
+        if state is not None:
+            segments = self._segments(account_id)
+            if segments and segments[-1] == state.path and state.path.stat().st_size == state.size:
+                return state
+            logger.debug(f"Ledger of account {account_id} was modified externally")
+
+        return self._recover_state(account_id)
+
+    def record(
+        self,
+        account_id: UUID,
+        event: models.LedgerEvent,
+        balance: Decimal,
+        previous_balance: Decimal = Decimal(0),
+        timestamp: datetime | None = None,
+    ) -> models.LedgerEntry:
+        """
+        Append balance change of an account to the ledger.
+
+        :param balance: Balance of the account after the change.
+        :param previous_balance: Balance before the change, used as opening balance of accounts without entries.
+        :return: Recorded entry.
+        """
+        with self._lock:
+            state = self._current_state(account_id)
+            timestamp = timestamp or datetime.now(UTC)
+            if state is not None:
+                timestamp = max(timestamp, state.last_timestamp + RESOLUTION)
+
+            lines = []
+            if state is None or state.entries >= SEGMENT_ENTRIES:
+                opening_balance = previous_balance if state is None else state.balance
+                path = self._account_directory(account_id) / f"{(timestamp - EPOCH) // RESOLUTION:020d}.ndjson"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                checkpoint = models.LedgerEntry(
+                    timestamp=timestamp, event=models.LedgerEvent.CHECKPOINT, balance=opening_balance
+                )
+                lines.append(checkpoint.model_dump_json(exclude={"amount"}))
+                state = _SegmentState(path=path, size=0, entries=0, balance=opening_balance, last_timestamp=timestamp)
+                logger.debug(f"Started ledger segment {path}")
+
+            entry = models.LedgerEntry(timestamp=timestamp, event=event, amount=balance - state.balance)
+            lines.append(entry.model_dump_json(exclude={"balance"}))
+            data = ("\n".join(lines) + "\n").encode()
+            with state.path.open("ab") as file:
+                file.write(data)
+
+            state.size += len(data)
+            state.entries += 1
+            state.balance = balance
+            state.last_timestamp = timestamp
+            self._states[account_id] = state
+            self._states.move_to_end(account_id)
+            while len(self._states) > MAX_CACHED_STATES:
+                self._states.popitem(last=False)
+
+        entry.balance = balance
+        return entry
+
+    def has_entries(self, account_id: UUID) -> bool:
+        """Check whether any balance change was recorded for an account."""
+        return bool(self._segments(account_id))
+
+    def history(
+        self, account_id: UUID, start: datetime | None = None, end: datetime | None = None
+    ) -> Iterator[models.LedgerEntry]:
+        """Iterate over balance changes of an account in time range, segments before `start` are skipped."""
+        segments = self._segments(account_id)
+        starts = [self._segment_start(segment) for segment in segments]
+        first = max(bisect_right(starts, start) - 1, 0) if start else 0
+
+        for segment_start, segment in zip(starts[first:], segments[first:]):
+            if end and segment_start > end:
+                return
+            for entry in self._replay(segment):
+                if end and entry.timestamp > end:
+                    return
+                if entry.event is models.LedgerEvent.CHECKPOINT or (start and entry.timestamp < start):
+                    continue
+                yield entry
+
+    def balance_at(self, account_id: UUID, at: datetime) -> Decimal | None:
+        """Balance of an account at given time, replaying only the segment `at` falls into."""
+        segments = self._segments(account_id)
+        idx = bisect_right([self._segment_start(segment) for segment in segments], at) - 1
+        if idx < 0:
+            return None
+
+        balance = None
+        for entry in self._replay(segments[idx]):
+            if entry.timestamp > at:
+                break
+            balance = entry.balance
+        return balance
@@ -1,5 +1,7 @@
 import uuid
+from datetime import datetime
 from decimal import Decimal
+from enum import StrEnum
 
 from pydantic import UUID4, BaseModel, Field, RootModel
 
@@ -16,3 +18,38 @@ class AccountsMap(RootModel):
     """Class representing a list of accounts."""
 
     root: dict[UUID4, Account] = Field(default_factory=lambda: {})
+
+
+class ImportLineError(BaseModel):
+    """Class representing an error of a single line of a bulk import."""
+
+    line: int
+    detail: str
+
+
+class ImportReport(BaseModel):
+    """Class representing an outcome of a bulk import."""
+
+    batches: int = 0
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[ImportLineError] = Field(default_factory=lambda: [])
+
+
+class LedgerEvent(StrEnum):
+    """Kinds of ledger entries, checkpoint holds balance of an account at the start of a segment."""
+
+    CHECKPOINT = "checkpoint"
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class LedgerEntry(BaseModel):
+    """Class representing a single balance change of an account."""
+
+    timestamp: datetime
+    event: LedgerEvent
+    amount: Decimal = Decimal(0)
+    balance: Decimal | None = None
@@ -1,19 +1,106 @@
+import hashlib
 import os
+import time
+from datetime import datetime
+from decimal import Decimal
+from itertools import batched
 from logging import getLogger
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, NamedTuple
 from uuid import UUID, uuid4
 
-from src.accounts import models
+from src.accounts import bulk, models, snapshot
+from src.accounts.ledger import AccountLedger
 from src.common import exceptions
 
 logger = getLogger(__name__)
 
+# File timestamps are taken from a coarse clock, a file modified again within this window after being cached could
+# keep the same mtime and size, so such cache entries are verified against digest of the file content (similar to how
+# git handles "racy" files).
+RACY_WINDOW_NS = 10_000_000
+
+
+class CachedAccounts(NamedTuple):
+    """Parsed accounts file with the file state it was parsed from."""
+
+    key: tuple[int, int, int]
+    digest: bytes
+    recorded_ns: int
+    accounts: models.AccountsMap
+
+
+class _HashingWriter:
+    """Binary file wrapper computing digest of written data."""
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.hash = hashlib.blake2b()
+
+    def write(self, data: bytes) -> int:
+        self.hash.update(data)
+        return self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+_accounts_cache: dict[Path, CachedAccounts] = {}
+
+
+def _file_key(stat: os.stat_result) -> tuple[int, int, int]:
+    """Key identifying state of a file, changes whenever file is replaced or modified."""
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _file_digest(file: BinaryIO) -> bytes:
+    """Digest of file content, file is rewound afterwards."""
+    digest = hashlib.file_digest(file, "blake2b").digest()
+    file.seek(0)
+    return digest
+
+
+def _cache_accounts(filepath: Path, stat: os.stat_result, digest: bytes, accounts: models.AccountsMap) -> None:
+    """Store accounts map parsed from, or written to, file in given state, cached map must not be modified."""
+    _accounts_cache[filepath] = CachedAccounts(
+        key=_file_key(stat), digest=digest, recorded_ns=time.time_ns(), accounts=accounts
+    )
+
+
+def _get_cached_accounts(filepath: Path) -> models.AccountsMap | None:
+    """
+    Return cached accounts map if file did not change since it was cached, None otherwise.
+
+    Entries cached within racy window of file modification are verified by comparing digest of file content,
+    which is much cheaper than parsing the file again.
+    """
+    cached = _accounts_cache.get(filepath)
+    if cached is None:
+        return None
+
+    key = _file_key(filepath.stat())
+    if cached.key == key and cached.recorded_ns - key[1] > RACY_WINDOW_NS:
+        return cached.accounts
+    if cached.key[2] != key[2]:
+        return None
+
+    with filepath.open("rb") as file:
+        stat = os.fstat(file.fileno())
+        if _file_digest(file) != cached.digest:
+            return None
+
+    _cache_accounts(filepath, stat, cached.digest, cached.accounts)
+    return cached.accounts
+
 
 class AccountPersistenceManager:
-    def __init__(self, filepath: Path | None = None):
+    def __init__(self, filepath: Path | None = None, compression: snapshot.SnapshotCompression | None = None):
         default_filepath = Path(os.getcwd()) / "data" / "accounts.json"
+        default_compression = os.getenv("ACCOUNTS_SNAPSHOT_COMPRESSION", snapshot.SnapshotCompression.NONE)
         self.filepath = filepath or default_filepath
-        print(f"Accounts filepath set to {self.filepath}")
+        self.compression = snapshot.SnapshotCompression(compression or default_compression)
+        self.ledger = AccountLedger(self.filepath.parent / "ledger")
+        logger.info(f"Accounts filepath set to {self.filepath}")
         self._create_file()
 
     def _create_file(self) -> bool:
@@ -32,30 +119,67 @@ class AccountPersistenceManager:
         return True
 
     def _load(self) -> models.AccountsMap:
-        """Load accounts data from file."""
+        """
+        Load accounts data from file, returned map is shared and must not be modified, see `_load_for_update`.
+
+        Parsed data is cached process-wide and reused as long as file inode, mtime and size did not change,
+        so file modified by external processes is always re-read. Compression is detected from file header.
+        """
         logger.debug("Loading accounts data")
-        with self.filepath.open("r") as file:
-            accounts = models.AccountsMap.model_validate_json(file.read())
-            logger.debug("Loaded accounts data")
+        accounts = _get_cached_accounts(self.filepath)
+        if accounts is not None:
+            logger.debug("Loaded accounts data from cache")
             return accounts
 
+        with self.filepath.open("rb") as file:
+            stat = os.fstat(file.fileno())
+            digest = _file_digest(file)
+            accounts = snapshot.read_snapshot(file)
+
+        _cache_accounts(self.filepath, stat, digest, accounts)
+        logger.debug("Loaded accounts data")
+        return accounts
+
+    def _load_for_update(self) -> models.AccountsMap:
+        """Load a copy of accounts data which can be modified and saved."""
+        return models.AccountsMap.model_construct(dict(self._load().root))
+
     def _save(self, accounts: models.AccountsMap) -> None:
-        """Save accounts data to file."""
+        """
+        Save accounts data to file using configured compression, and update cached data with saved one.
+
+        Saved map is cached as is, so it must not be modified afterward.
+        """
         logger.debug("Saving accounts data")
-        with self.filepath.open("w") as file:
-            file.write(accounts.model_dump_json())
+        with self.filepath.open("wb") as file:
+            writer = _HashingWriter(file)
+            snapshot.write_snapshot(writer, accounts, self.compression)
+            file.flush()
+            stat = os.fstat(file.fileno())
+
+        _cache_accounts(self.filepath, stat, writer.hash.digest(), accounts)
         logger.debug("Saved accounts data")
 
-    def _validate_username(self, username: str, accounts: models.AccountsMap) -> None:
-        """Validate if username is unique across all users, if not raise an exception."""
+    def warm_up(self) -> None:
+        """Load and cache accounts data ahead of the first request."""
+        accounts = self._load()
+        logger.info(f"Loaded {len(accounts.root)} accounts from {self.filepath}")
+
+    def close(self) -> None:
+        """Release cached accounts data, all writes are flushed to file when saved."""
+        _accounts_cache.pop(self.filepath, None)
+        logger.info(f"Closed accounts file {self.filepath}")
+
+    def _validate_username(self, username: str, accounts: models.AccountsMap, account_id: UUID | None = None) -> None:
+        """Validate if username is unique across all users other than `account_id`, if not raise an exception."""
         for existing_account in accounts.root.values():
-            if existing_account.username == username:
+            if existing_account.username == username and existing_account.id != account_id:
                 raise exceptions.RecordAlreadyExists(f"Account with username {username} already exists.")
 
     def create(self, account: models.Account) -> models.Account:
         """Create new account with provided payload."""
         logger.debug(f"Creating new account with payload {account}")
-        accounts = self._load()
+        accounts = self._load_for_update()
 
         self._validate_username(account.username, accounts)
 
@@ -72,6 +196,7 @@ class AccountPersistenceManager:
 
         accounts.root[account.id] = account
         self._save(accounts)
+        self.ledger.record(account.id, models.LedgerEvent.CREATE, account.balance)
         logger.debug(f"Account with id {account.id} was created")
         return account
 
@@ -83,6 +208,56 @@ class AccountPersistenceManager:
         logger.debug(f"Retrieved {len(accounts)} accounts")
         return accounts
 
+    def iter_accounts(self) -> Iterator[models.Account]:
+        """Lazily iterate over all accounts, used for streaming exports."""
+        logger.debug("Iterating over accounts")
+        accounts_map = self._load()
+        yield from accounts_map.root.values()
+
+    def bulk_create(
+        self, records: Iterable[bulk.ParsedRecord], batch_size: int = bulk.DEFAULT_BATCH_SIZE
+    ) -> models.ImportReport:
+        """
+        Create accounts from parsed records, processing them in batches of fixed size.
+
+        Usernames are checked against a set built once, and the file is written once after all batches were
+        processed. Invalid and conflicting records are reported per line and do not abort the import.
+        No ledger entries are written, ledger of an imported account starts with its first balance change.
+
+        :return: Report with number of processed, imported and failed records.
+        """
+        logger.debug("Bulk creating accounts")
+        accounts = self._load_for_update()
+        usernames = {account.username for account in accounts.root.values()}
+        report = models.ImportReport()
+
+        def reject(line: int, detail: str) -> None:
+            report.failed += 1
+            if len(report.errors) < bulk.MAX_REPORTED_IMPORT_ERRORS:
+                report.errors.append(models.ImportLineError(line=line, detail=detail))
+
+        for batch in batched(records, batch_size):
+            for record in batch:
+                report.processed += 1
+                account = record.account
+                if account is None:
+                    reject(record.line, record.error or "Invalid record")
+                elif account.username in usernames:
+                    reject(record.line, f"Account with username {account.username} already exists.")
+                elif account.id in accounts.root:
+                    reject(record.line, f"Account with id {account.id} already exists.")
+                else:
+                    usernames.add(account.username)
+                    accounts.root[account.id] = account
+                    report.imported += 1
+            report.batches += 1
+            logger.info(f"Bulk import batch {report.batches}: processed {report.processed}, imported {report.imported}")
+
+        if report.imported:
+            self._save(accounts)
+        logger.debug(f"Bulk created {report.imported} accounts, {report.failed} failed")
+        return report
+
     def get(self, account_id: UUID) -> models.Account:
         """Retrieve an account by identifier"""
         logger.debug(f"Retrieving account {account_id}")
@@ -100,24 +275,61 @@ class AccountPersistenceManager:
     def update(self, account_id: UUID, account: models.Account) -> models.Account:
         """Set record with id to newly provided value."""
         logger.debug(f"Updating account with id {account_id} using payload {account}")
-        accounts = self._load()
+        accounts = self._load_for_update()
 
-        self.get(account_id)
-        self._validate_username(account.username, accounts)
+        old_account = self.get(account_id)
+        self._validate_username(account.username, accounts, account_id)
 
         account.id = account_id
         accounts.root[account_id] = account
         self._save(accounts)
+        if account.balance != old_account.balance:
+            self.ledger.record(
+                account_id, models.LedgerEvent.UPDATE, account.balance, previous_balance=old_account.balance
+            )
         logger.debug(f"Account with id {account_id} was updated")
         return account
 
     def delete(self, account_id: UUID) -> None:
         """Delete account by provided id."""
         logger.debug(f"Deleting account with id {account_id}")
-        accounts = self._load()
+        accounts = self._load_for_update()
 
         account = self.get(account_id)
 
         del accounts.root[account.id]
         self._save(accounts)
+        self.ledger.record(account.id, models.LedgerEvent.DELETE, Decimal(0), previous_balance=account.balance)
         logger.debug(f"Account with id {account_id} was deleted")
+
+    def history(
+        self, account_id: UUID, start: datetime | None = None, end: datetime | None = None
+    ) -> Iterator[models.LedgerEntry]:
+        """Retrieve balance changes of an account in time range, empty for accounts created before the ledger."""
+        logger.debug(f"Retrieving history of account {account_id}")
+        if not self.ledger.has_entries(account_id) and account_id not in self._load().root:
+            msg = f"History of account with id {account_id} does not exist"
+            logger.error(msg)
+            raise exceptions.RecordDoesNotExist(msg)
+
+        return self.ledger.history(account_id, start, end)
+
+    def balance_at(self, account_id: UUID, at: datetime) -> Decimal:
+        """
+        Retrieve balance of an account at given time.
+
+        Accounts without any recorded balance change, created before the ledger existed, report their current balance.
+        """
+        logger.debug(f"Retrieving balance of account {account_id} at {at}")
+        if self.ledger.has_entries(account_id):
+            balance = self.ledger.balance_at(account_id, at)
+        else:
+            account = self._load().root.get(account_id)
+            balance = account.balance if account is not None else None
+
+        if balance is None:
+            msg = f"Balance of account with id {account_id} at {at} is not known"
+            logger.error(msg)
+            raise exceptions.RecordDoesNotExist(msg)
+
+        return balance
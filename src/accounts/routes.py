@@ -1,23 +1,71 @@
+from datetime import UTC, datetime
+from typing import Callable, TypeVar
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from typing_extensions import Annotated
 
-from src.accounts import models, schema
+from src.accounts import bulk, models, schema
 from src.accounts.persistance import AccountPersistenceManager
 from src.common import exceptions
+from src.common.idempotency import IdempotencyCache
 from src.common.schema import ErrorResponse
 
+T = TypeVar("T")
+
 router = APIRouter(tags=["accounts"])
 
 
-def get_account_persistence_manger():
-    return AccountPersistenceManager()
+def get_account_persistence_manger(request: Request) -> AccountPersistenceManager:
+    return request.app.state.account_persistence_manager
 
 
 AccountPersistenceManagerDependency = Annotated[AccountPersistenceManager, Depends(get_account_persistence_manger)]
 
 
+class IdempotentRequest:
+    """Request which, when sent with `Idempotency-Key` header, is executed at most once per key."""
+
+    def __init__(self, cache: IdempotencyCache, scope: str, key: str | None):
+        self.cache = cache
+        self.scope = scope
+        self.key = key
+
+    def run(self, fingerprint: str, func: Callable[[], T]) -> T:
+        if self.key is None:
+            return func()
+
+        try:
+            return self.cache.run(f"{self.scope} {self.key}", fingerprint, func)
+        except exceptions.IdempotencyKeyReused as err:
+            raise HTTPException(status_code=422, detail=str(err))
+        except exceptions.IdempotencyKeyInProgress as err:
+            raise HTTPException(status_code=409, detail=str(err))
+
+
+def get_idempotency_cache(request: Request) -> IdempotencyCache:
+    return request.app.state.idempotency_cache
+
+
+def get_idempotent_request(
+    request: Request,
+    cache: Annotated[IdempotencyCache, Depends(get_idempotency_cache)],
+    idempotency_key: Annotated[str | None, Header()] = None,
+) -> IdempotentRequest:
+    return IdempotentRequest(cache, f"{request.method} {request.url.path}", idempotency_key)
+
+
+IdempotentRequestDependency = Annotated[IdempotentRequest, Depends(get_idempotent_request)]
+
+
+def as_utc(value: datetime | None) -> datetime | None:
+    """Treat timestamps without timezone as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
 @router.get(
     "/",
     description="Retrieve list of all accounts",
@@ -27,6 +75,32 @@ def list_accounts(manager: AccountPersistenceManagerDependency) -> schema.Accoun
     return schema.AccountsList.model_validate(accounts)
 
 
+@router.get(
+    "/export/",
+    description="Stream all accounts as NDJSON or CSV",
+    response_class=StreamingResponse,
+)
+def export_accounts(
+    manager: AccountPersistenceManagerDependency, format: bulk.BulkFormat = bulk.BulkFormat.NDJSON
+) -> StreamingResponse:
+    return StreamingResponse(
+        bulk.encode(manager.iter_accounts(), format),
+        media_type=format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="accounts.{format}"'},
+    )
+
+
+@router.post(
+    "/import/",
+    description="Create accounts from uploaded NDJSON or CSV file, invalid lines are reported and skipped.",
+)
+def import_accounts(
+    manager: AccountPersistenceManagerDependency, file: UploadFile, format: bulk.BulkFormat = bulk.BulkFormat.NDJSON
+) -> schema.ImportReport:
+    report = manager.bulk_create(bulk.parse(file.file, format))
+    return schema.ImportReport.model_validate(report.model_dump())
+
+
 @router.get(
     "/{account_id}/",
     description="Retrieve a specific account by id",
@@ -43,6 +117,48 @@ def get_account_by_id(manager: AccountPersistenceManagerDependency, account_id:
     return schema.Account.model_validate(account.model_dump())
 
 
+@router.get(
+    "/{account_id}/history/",
+    description="Retrieve balance changes of account with specified id, optionally limited to a time range.",
+    responses={
+        404: {"model": ErrorResponse},
+    },
+)
+def get_account_history(
+    manager: AccountPersistenceManagerDependency,
+    account_id: UUID,
+    start: Annotated[datetime | None, Query(alias="from")] = None,
+    end: Annotated[datetime | None, Query(alias="to")] = None,
+) -> schema.AccountHistory:
+    try:
+        entries = manager.history(account_id, as_utc(start), as_utc(end))
+    except exceptions.RecordDoesNotExist:
+        raise HTTPException(status_code=404, detail="Account history not found")
+
+    return schema.AccountHistory.model_validate(
+        {"account_id": account_id, "entries": [entry.model_dump() for entry in entries]}
+    )
+
+
+@router.get(
+    "/{account_id}/balance/",
+    description="Retrieve balance of account with specified id at a point in time, defaults to now.",
+    responses={
+        404: {"model": ErrorResponse},
+    },
+)
+def get_account_balance_at(
+    manager: AccountPersistenceManagerDependency, account_id: UUID, at: datetime | None = None
+) -> schema.AccountBalance:
+    at = as_utc(at) or datetime.now(UTC)
+    try:
+        balance = manager.balance_at(account_id, at)
+    except exceptions.RecordDoesNotExist:
+        raise HTTPException(status_code=404, detail="Account balance not found")
+
+    return schema.AccountBalance(account_id=account_id, at=at, balance=balance)
+
+
 @router.post(
     "/",
     description="Create a new account",
@@ -52,15 +168,20 @@ def get_account_by_id(manager: AccountPersistenceManagerDependency, account_id:
     },
 )
 def create_new_account(
-    manager: AccountPersistenceManagerDependency, account_data: schema.CreateAccountBody
+    manager: AccountPersistenceManagerDependency,
+    idempotent_request: IdempotentRequestDependency,
+    account_data: schema.CreateAccountBody,
 ) -> schema.Account:
-    account = models.Account.model_validate(account_data.model_dump())
-    try:
-        new_account = manager.create(account)
-    except exceptions.RecordAlreadyExists as err:
-        raise HTTPException(status_code=409, detail=str(err))
+    def create() -> schema.Account:
+        account = models.Account.model_validate(account_data.model_dump())
+        try:
+            new_account = manager.create(account)
+        except exceptions.RecordAlreadyExists as err:
+            raise HTTPException(status_code=409, detail=str(err))
 
-    return schema.Account.model_validate(new_account.model_dump())
+        return schema.Account.model_validate(new_account.model_dump())
+
+    return idempotent_request.run(account_data.model_dump_json(), create)
 
 
 @router.put(
@@ -79,7 +200,7 @@ def replace_account_with_id(
         updated_account = manager.update(account_id, account)
     except exceptions.RecordDoesNotExist:
         raise HTTPException(status_code=404, detail="Account not found")
-    except exceptions.RecordUpdateFailed as err:
+    except (exceptions.RecordUpdateFailed, exceptions.RecordAlreadyExists) as err:
         raise HTTPException(status_code=409, detail=str(err))
 
     return schema.Account.model_validate(updated_account.model_dump())
@@ -94,24 +215,30 @@ def replace_account_with_id(
     },
 )
 def update_account_by_id(
-    manager: AccountPersistenceManagerDependency, account_id: UUID, account_data: schema.UpdateAccountBody
+    manager: AccountPersistenceManagerDependency,
+    idempotent_request: IdempotentRequestDependency,
+    account_id: UUID,
+    account_data: schema.UpdateAccountBody,
 ) -> schema.Account:
-    try:
-        old_account = manager.get(account_id)
-    except exceptions.RecordDoesNotExist:
-        raise HTTPException(status_code=404, detail="Account not found")
+    def update() -> schema.Account:
+        try:
+            old_account = manager.get(account_id)
+        except exceptions.RecordDoesNotExist:
+            raise HTTPException(status_code=404, detail="Account not found")
 
-    merged_data = {**old_account.model_dump(), **account_data.model_dump(exclude_defaults=True)}
-    account = models.Account.model_validate(merged_data)
+        merged_data = {**old_account.model_dump(), **account_data.model_dump(exclude_defaults=True)}
+        account = models.Account.model_validate(merged_data)
 
-    try:
-        updated_account = manager.update(account_id, account)
-    except exceptions.RecordDoesNotExist:
-        raise HTTPException(status_code=404, detail="Account not found")
-    except exceptions.RecordUpdateFailed as err:
-        raise HTTPException(status_code=409, detail=str(err))
+        try:
+            updated_account = manager.update(account_id, account)
+        except exceptions.RecordDoesNotExist:
+            raise HTTPException(status_code=404, detail="Account not found")
+        except (exceptions.RecordUpdateFailed, exceptions.RecordAlreadyExists) as err:
+            raise HTTPException(status_code=409, detail=str(err))
 
-    return schema.Account.model_validate(updated_account.model_dump())
+        return schema.Account.model_validate(updated_account.model_dump())
+
+    return idempotent_request.run(account_data.model_dump_json(exclude_defaults=True), update)
 
 
 @router.delete(
@@ -1,8 +1,12 @@
+from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
 from pydantic import BaseModel, Field, RootModel
 
+from src.accounts.bulk import MAX_REPORTED_IMPORT_ERRORS
+from src.accounts.models import LedgerEvent
+
 
 class Account(BaseModel):
     """Model representing an account."""
@@ -30,3 +34,46 @@ class UpdateAccountBody(BaseModel):
 
     username: str | None = Field(default=None, examples=["DogPool", "Knuckles"])
     balance: Decimal | None = Field(default=None, examples=["0", "42"])
+
+
+class ImportLineError(BaseModel):
+    """Model representing an error of a single line of a bulk import."""
+
+    line: int = Field(examples=[1, 42])
+    detail: str = Field(examples=["Account with username DogPool already exists."])
+
+
+class ImportReport(BaseModel):
+    """Model representing an outcome of a bulk import."""
+
+    batches: int = Field(examples=[1], description="Number of batches records were processed in.")
+    processed: int = Field(examples=[1000])
+    imported: int = Field(examples=[998])
+    failed: int = Field(examples=[2])
+    errors: list[ImportLineError] = Field(
+        description=f"First {MAX_REPORTED_IMPORT_ERRORS} failed lines, `failed` holds the total number."
+    )
+
+
+class LedgerEntry(BaseModel):
+    """Model representing a single balance change of an account."""
+
+    timestamp: datetime = Field(examples=["2025-04-01T12:00:00Z"])
+    event: LedgerEvent = Field(examples=["create", "update", "delete"])
+    amount: Decimal = Field(examples=["42", "-10"])
+    balance: Decimal = Field(examples=["42", "32"])
+
+
+class AccountHistory(BaseModel):
+    """Model representing balance changes of an account in a time range."""
+
+    account_id: UUID = Field(examples=["d5468285-dc82-40e8-8640-0f5c54aa01ed"])
+    entries: list[LedgerEntry]
+
+
+class AccountBalance(BaseModel):
+    """Model representing balance of an account at a point in time."""
+
+    account_id: UUID = Field(examples=["d5468285-dc82-40e8-8640-0f5c54aa01ed"])
+    at: datetime = Field(examples=["2025-04-01T12:00:00Z"])
+    balance: Decimal = Field(examples=["0", "42"])
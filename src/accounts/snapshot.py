@@ -0,0 +1,93 @@
+import gzip
+import io
+from enum import StrEnum
+from itertools import batched
+from typing import BinaryIO, Iterator
+
+from pydantic import TypeAdapter
+
+from src.accounts import bulk, models
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+DECODE_BATCH_SIZE = 1000
+
+_accounts_batch_adapter = TypeAdapter(list[models.Account])
+
+
+class SnapshotCompression(StrEnum):
+    """
+    Compression of accounts snapshot file.
+
+    Uncompressed snapshot is a single JSON object mapping ids to accounts, compressed snapshots contain one account
+    per line (NDJSON), so they can be encoded and decoded as a stream.
+    """
+
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise RuntimeError("zstd snapshot compression requires `zstandard` package, install `accountrix[zstd]`.")
+
+
+def detect_compression(header: bytes) -> SnapshotCompression:
+    """Detect snapshot compression from first bytes of the file."""
+    if header.startswith(GZIP_MAGIC):
+        return SnapshotCompression.GZIP
+    if header.startswith(ZSTD_MAGIC):
+        return SnapshotCompression.ZSTD
+    return SnapshotCompression.NONE
+
+
+def _decode_lines(lines: Iterator[bytes]) -> models.AccountsMap:
+    """Decode accounts from NDJSON lines, validating them in batches of fixed size."""
+    accounts = {}
+    for batch in batched((line for line in lines if line.strip()), DECODE_BATCH_SIZE):
+        for account in _accounts_batch_adapter.validate_json(b"[" + b",".join(batch) + b"]"):
+            accounts[account.id] = account
+    return models.AccountsMap.model_construct(accounts)
+
+
+def read_snapshot(file: BinaryIO) -> models.AccountsMap:
+    """Read accounts snapshot, compression is detected automatically from magic header."""
+    compression = detect_compression(file.read(len(ZSTD_MAGIC)))
+    file.seek(0)
+
+    if compression is SnapshotCompression.GZIP:
+        with gzip.GzipFile(fileobj=file, mode="rb") as stream:
+            return _decode_lines(iter(stream))
+
+    if compression is SnapshotCompression.ZSTD:
+        _require_zstandard()
+        with zstandard.ZstdDecompressor().stream_reader(file, closefd=False) as reader:
+            return _decode_lines(iter(io.BufferedReader(reader)))
+
+    return models.AccountsMap.model_validate_json(file.read())
+
+
+def write_snapshot(file: BinaryIO, accounts: models.AccountsMap, compression: SnapshotCompression) -> None:
+    """Write accounts snapshot using specified compression, compressed snapshots are encoded as a stream."""
+    if compression is SnapshotCompression.GZIP:
+        with gzip.GzipFile(fileobj=file, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as stream:
+            for chunk in bulk.encode_ndjson(accounts.root.values()):
+                stream.write(chunk)
+        return
+
+    if compression is SnapshotCompression.ZSTD:
+        _require_zstandard()
+        with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(file, closefd=False) as writer:
+            for chunk in bulk.encode_ndjson(accounts.root.values()):
+                writer.write(chunk)
+        return
+
+    file.write(accounts.model_dump_json().encode())
@@ -23,3 +23,18 @@ class RecordAlreadyExists(Exception):
     """Exception raised when a record could not be deleted."""
 
     pass
+
+
+# Idempotency exceptions
+
+
+class IdempotencyKeyReused(Exception):
+    """Exception raised when an idempotency key is reused with a different request payload."""
+
+    pass
+
+
+class IdempotencyKeyInProgress(Exception):
+    """Exception raised when a request with the same idempotency key did not finish in time."""
+
+    pass
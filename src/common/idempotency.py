@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Callable, TypeVar
+
+from src.common import exceptions
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_SIZE = 10_000
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_WAIT_TIMEOUT = 30
+
+
+def _copy_error(error: Exception) -> Exception:
+    """Copy of an exception without its traceback, context and cause, so stored errors keep no frames alive."""
+    fresh = error.__class__.__new__(error.__class__)
+    fresh.__dict__.update(error.__dict__)
+    fresh.args = error.args
+    return fresh
+
+
+@dataclass
+class _Entry:
+    """Outcome of a request, `done` is set once the first request with given key finished."""
+
+    fingerprint: str
+    done: threading.Event = field(default_factory=threading.Event)
+    completed: bool = False
+    expires_at: float = float("inf")
+    result: Any = None
+    error: Exception | None = None
+
+
+class IdempotencyCache:
+    """
+    Bounded cache of request outcomes keyed by idempotency key, entries expire after `ttl` seconds.
+
+    First request with a key is executed, concurrent duplicates wait for it to finish, and later duplicates
+    receive its stored outcome. Errors of `cacheable_errors` types are stored as well, any other error is not,
+    so the next duplicate executes the request again.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: float = DEFAULT_TTL,
+        wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+        cacheable_errors: tuple[type[Exception], ...] = (),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.cacheable_errors = cacheable_errors
+        self.clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float) -> None:
+        """
+        Drop expired entries, and the oldest ones if cache is over its size, entries are ordered by insertion.
+
+        Requests still in progress are never evicted, so their duplicates keep waiting for them.
+        """
+        overflow = len(self._entries) - self.max_size
+        stale = []
+        for key, entry in self._entries.items():
+            if not entry.completed:
+                continue
+            if entry.expires_at > now and overflow <= 0:
+                break
+            stale.append(key)
+            overflow -= 1
+
+        for key in stale:
+            del self._entries[key]
+
+    def _claim(self, key: str, fingerprint: str) -> tuple[_Entry, bool]:
+        """Return entry for a key, and whether it was created by this call, meaning caller should execute request."""
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                entry = _Entry(fingerprint=fingerprint)
+                self._entries[key] = entry
+                self._evict(now)
+                return entry, True
+
+        if entry.fingerprint != fingerprint:
+            raise exceptions.IdempotencyKeyReused(f"Idempotency key {key} was already used with a different payload.")
+        return entry, False
+
+    def _complete(self, entry: _Entry, result: Any = None, error: Exception | None = None) -> None:
+        with self._lock:
+            entry.completed = True
+            entry.result = result
+            entry.error = _copy_error(error) if error is not None else None
+            entry.expires_at = self.clock() + self.ttl
+        entry.done.set()
+
+    def _abandon(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def run(self, key: str, fingerprint: str, func: Callable[[], T]) -> T:
+        """
+        Execute `func` once per key, returning stored outcome for repeated keys.
+
+        :param key: Idempotency key, should be scoped to the endpoint by the caller.
+        :param fingerprint: Representation of request payload, reusing key with a different one is an error.
+        """
+        while True:
+            entry, owner = self._claim(key, fingerprint)
+            if owner:
+                break
+
+            logger.debug(f"Waiting for outcome of request with idempotency key {key}")
+            if not entry.done.wait(timeout=self.wait_timeout):
+                raise exceptions.IdempotencyKeyInProgress(f"Request with idempotency key {key} is still in progress.")
+            if entry.completed:
+                logger.debug(f"Replaying outcome of request with idempotency key {key}")
+                if entry.error is not None:
+                    raise _copy_error(entry.error)
+                return entry.result
+
+        try:
+            result = func()
+        except self.cacheable_errors as err:
+            self._complete(entry, error=err)
+            raise
+        except BaseException:
+            self._abandon(key, entry)
+            raise
+
+        self._complete(entry, result=result)
+        return result
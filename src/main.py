@@ -1,6 +1,10 @@
-from fastapi import APIRouter, FastAPI
+from contextlib import asynccontextmanager
 
+from fastapi import APIRouter, FastAPI, HTTPException
+
+from src.accounts.persistance import AccountPersistenceManager
 from src.accounts.routes import router as accounts_router
+from src.common.idempotency import IdempotencyCache
 from src.health.routes import router as health_router
 
 api_router = APIRouter(prefix="/api/v1")
@@ -8,9 +12,23 @@ api_router.include_router(health_router, prefix="/health")
 api_router.include_router(accounts_router, prefix="/accounts")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create state shared by all requests on startup, and release it on shutdown."""
+    manager = AccountPersistenceManager()
+    manager.warm_up()
+    app.state.account_persistence_manager = manager
+    app.state.idempotency_cache = IdempotencyCache(cacheable_errors=(HTTPException,))
+    try:
+        yield
+    finally:
+        manager.close()
+
+
 app = FastAPI(
     title="Accountrix API",
     description="This is a simple API allowing user to perform CRUD operations on accounts.",
     contact={"email": "krzysztof.plonka64@gmail.com"},
+    lifespan=lifespan,
 )
 app.include_router(api_router)
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+from src.accounts import bulk, models
+from tests.accounts.factories import create_accounts_map
+
+
+def test_parse_ndjson_happy_path():
+    accounts = create_accounts_map(3)
+    content = "\n".join(acc.model_dump_json() for acc in accounts.root.values()) + "\n"
+
+    result = list(bulk.parse(io.BytesIO(content.encode()), bulk.BulkFormat.NDJSON))
+
+    assert [record.line for record in result] == [1, 2, 3]
+    assert [record.account for record in result] == list(accounts.root.values())
+    assert all(record.error is None for record in result)
+
+
+def test_parse_ndjson_invalid_lines():
+    content = b'{"username": "DogPool", "balance": "42"}\n\nnot json\n{"username": "Knuckles"}\n'
+
+    result = list(bulk.parse(io.BytesIO(content), bulk.BulkFormat.NDJSON))
+
+    assert len(result) == 3
+    assert result[0].account.username == "DogPool"
+    assert result[0].account.balance == Decimal(42)
+    assert result[1].line == 3
+    assert result[1].account is None
+    assert result[1].error
+    assert result[2].line == 4
+    assert "balance" in result[2].error
+
+
+def test_parse_csv_happy_path():
+    content = b"username,balance\nDogPool,42\nKnuckles,not-a-number\n"
+
+    result = list(bulk.parse(io.BytesIO(content), bulk.BulkFormat.CSV))
+
+    assert len(result) == 2
+    assert result[0].line == 2
+    assert result[0].account.username == "DogPool"
+    assert result[0].account.balance == Decimal(42)
+    assert result[1].line == 3
+    assert result[1].account is None
+    assert "balance" in result[1].error
+
+
+def test_parse_csv_malformed_rows_skipped():
+    content = b"username,balance\nDogPool,42\nFrog\xffDoom,1\nHamster\rQuad,2\nKnuckles,7\n"
+
+    result = list(bulk.parse(io.BytesIO(content), bulk.BulkFormat.CSV))
+
+    assert [record.line for record in result] == [2, 3, 4, 5]
+    assert [record.account.username for record in result if record.account] == ["DogPool", "Knuckles"]
+    assert "UTF-8" in result[1].error
+    assert "new-line character" in result[2].error
+
+
+def test_encode_ndjson_batches():
+    accounts = list(create_accounts_map(5).root.values())
+
+    chunks = list(bulk.encode(accounts, bulk.BulkFormat.NDJSON, batch_size=2))
+
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [models.Account.model_validate(json.loads(line)) for line in lines] == accounts
+
+
+def test_encode_csv_round_trip():
+    accounts = list(create_accounts_map(5).root.values())
+
+    chunks = list(bulk.encode(accounts, bulk.BulkFormat.CSV, batch_size=2))
+
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [models.Account.model_validate(row) for row in rows] == accounts
+    parsed = [record.account for record in bulk.parse(io.BytesIO(b"".join(chunks)), bulk.BulkFormat.CSV)]
+    assert parsed == accounts
+
+
+def test_encode_csv_empty():
+    assert b"".join(bulk.encode([], bulk.BulkFormat.CSV)) == b"id,username,balance\r\n"
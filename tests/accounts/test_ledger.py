@@ -0,0 +1,190 @@
+import uuid
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from src.accounts import ledger, models
+from src.accounts.ledger import AccountLedger
+
+START = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def account_ledger(tmp_path):
+    return AccountLedger(tmp_path / "ledger")
+
+
+@pytest.fixture
+def account_id():
+    return uuid.uuid4()
+
+
+def record_balances(account_ledger, account_id, balances):
+    account_ledger.record(account_id, models.LedgerEvent.CREATE, Decimal(0), timestamp=START)
+    for idx, balance in enumerate(balances, start=1):
+        account_ledger.record(
+            account_id, models.LedgerEvent.UPDATE, Decimal(balance), timestamp=START + timedelta(minutes=idx)
+        )
+
+
+def test_record_appends_entries(account_ledger, account_id):
+    account_ledger.record(account_id, models.LedgerEvent.CREATE, Decimal(42), timestamp=START)
+    entry = account_ledger.record(
+        account_id, models.LedgerEvent.UPDATE, Decimal(30), timestamp=START + timedelta(minutes=1)
+    )
+
+    assert entry.amount == Decimal(-12)
+    assert entry.balance == Decimal(30)
+    segments = list((account_ledger.directory / str(account_id)).iterdir())
+    assert len(segments) == 1
+    assert len(segments[0].read_text().splitlines()) == 3
+
+
+def test_record_opening_balance_of_account_without_entries(account_ledger, account_id):
+    account_ledger.record(
+        account_id, models.LedgerEvent.UPDATE, Decimal(50), previous_balance=Decimal(20), timestamp=START
+    )
+
+    [entry] = account_ledger.history(account_id)
+    assert entry.amount == Decimal(30)
+    assert entry.balance == Decimal(50)
+
+
+def test_record_keeps_timestamps_increasing(account_ledger, account_id):
+    account_ledger.record(account_id, models.LedgerEvent.CREATE, Decimal(1), timestamp=START)
+    entry = account_ledger.record(account_id, models.LedgerEvent.UPDATE, Decimal(2), timestamp=START)
+
+    assert entry.timestamp > START
+
+
+def test_record_rotates_segments(monkeypatch, account_ledger, account_id):
+    monkeypatch.setattr(ledger, "SEGMENT_ENTRIES", 3)
+
+    record_balances(account_ledger, account_id, range(1, 10))
+
+    segments = account_ledger._segments(account_id)
+    assert len(segments) == 4
+    assert [len(segment.read_text().splitlines()) for segment in segments] == [4, 4, 4, 2]
+    assert [entry.balance for entry in account_ledger.history(account_id)] == [Decimal(b) for b in range(10)]
+
+
+def test_record_recovers_state_from_file(monkeypatch, account_ledger, account_id):
+    monkeypatch.setattr(ledger, "SEGMENT_ENTRIES", 3)
+    record_balances(account_ledger, account_id, [10, 20])
+
+    restarted = AccountLedger(account_ledger.directory)
+    entry = restarted.record(account_id, models.LedgerEvent.UPDATE, Decimal(5), timestamp=START + timedelta(minutes=10))
+
+    assert entry.amount == Decimal(-15)
+    assert len(restarted._segments(account_id)) == 2
+
+
+def test_history_time_range(monkeypatch, account_ledger, account_id):
+    monkeypatch.setattr(ledger, "SEGMENT_ENTRIES", 3)
+    record_balances(account_ledger, account_id, range(1, 10))
+
+    entries = list(account_ledger.history(account_id, START + timedelta(minutes=4), START + timedelta(minutes=6)))
+
+    assert [entry.timestamp for entry in entries] == [START + timedelta(minutes=m) for m in (4, 5, 6)]
+    assert [entry.balance for entry in entries] == [Decimal(4), Decimal(5), Decimal(6)]
+    assert all(entry.amount == Decimal(1) for entry in entries)
+
+
+def test_history_no_entries(account_ledger, account_id):
+    assert list(account_ledger.history(account_id)) == []
+
+
+def test_balance_at(monkeypatch, account_ledger, account_id):
+    monkeypatch.setattr(ledger, "SEGMENT_ENTRIES", 3)
+    record_balances(account_ledger, account_id, [10, 20, 30, 40, 50])
+
+    assert account_ledger.balance_at(account_id, START - timedelta(seconds=1)) is None
+    assert account_ledger.balance_at(account_id, START) == Decimal(0)
+    assert account_ledger.balance_at(account_id, START + timedelta(minutes=3, seconds=30)) == Decimal(30)
+    assert account_ledger.balance_at(account_id, START + timedelta(minutes=4)) == Decimal(40)
+    assert account_ledger.balance_at(account_id, START + timedelta(days=1)) == Decimal(50)
+
+
+def test_history_ignores_incomplete_entry(account_ledger, account_id):
+    record_balances(account_ledger, account_id, [10])
+    with account_ledger._segments(account_id)[-1].open("a") as file:
+        file.write('{"timestamp": "2025-01-01T00:05:00Z", "event": "upd')
+
+    assert [entry.balance for entry in account_ledger.history(account_id)] == [Decimal(0), Decimal(10)]
+
+
+def test_record_bounds_cached_states(monkeypatch, account_ledger):
+    monkeypatch.setattr(ledger, "MAX_CACHED_STATES", 2)
+    account_ids = [uuid.uuid4() for _ in range(3)]
+
+    for account_id in account_ids:
+        account_ledger.record(account_id, models.LedgerEvent.CREATE, Decimal(1), timestamp=START)
+    entry = account_ledger.record(
+        account_ids[0], models.LedgerEvent.UPDATE, Decimal(3), timestamp=START + timedelta(minutes=1)
+    )
+
+    assert len(account_ledger._states) == 2
+    assert entry.amount == Decimal(2)
+
+
+@pytest.mark.parametrize("restart", [False, True])
+def test_record_after_torn_write(account_ledger, account_id, restart):
+    record_balances(account_ledger, account_id, [10])
+    segment = account_ledger._segments(account_id)[-1]
+    with segment.open("a") as file:
+        file.write('{"timestamp": "2025-01-01T00:05:00Z", "event": "upd')
+    if restart:
+        account_ledger = AccountLedger(account_ledger.directory)
+
+    entry = account_ledger.record(
+        account_id, models.LedgerEvent.UPDATE, Decimal(25), timestamp=START + timedelta(minutes=10)
+    )
+
+    assert entry.amount == Decimal(15)
+    assert segment.read_text().endswith("\n")
+    assert [entry.balance for entry in account_ledger.history(account_id)] == [Decimal(0), Decimal(10), Decimal(25)]
+
+
+def test_record_after_torn_checkpoint(account_ledger, account_id):
+    record_balances(account_ledger, account_id, [10])
+    torn = account_ledger._account_directory(account_id) / f"{99999999999999999999:020d}.ndjson"
+    torn.write_text('{"timestamp": "2025-01-01T00:05:00Z", "event": "check')
+    account_ledger = AccountLedger(account_ledger.directory)
+
+    account_ledger.record(account_id, models.LedgerEvent.UPDATE, Decimal(25), timestamp=START + timedelta(minutes=10))
+
+    assert not torn.exists()
+    assert [entry.balance for entry in account_ledger.history(account_id)] == [Decimal(0), Decimal(10), Decimal(25)]
+
+
+def test_record_after_external_append(account_ledger, account_id):
+    external = AccountLedger(account_ledger.directory)
+    account_ledger.record(account_id, models.LedgerEvent.CREATE, Decimal(10), timestamp=START)
+    external.record(account_id, models.LedgerEvent.UPDATE, Decimal(30), timestamp=START + timedelta(minutes=1))
+
+    entry = account_ledger.record(
+        account_id, models.LedgerEvent.UPDATE, Decimal(35), timestamp=START + timedelta(minutes=2)
+    )
+
+    assert entry.amount == Decimal(5)
+    assert [entry.balance for entry in account_ledger.history(account_id)] == [Decimal(10), Decimal(30), Decimal(35)]
+
+
+def test_record_after_external_segment_rotation(monkeypatch, account_ledger, account_id):
+    monkeypatch.setattr(ledger, "SEGMENT_ENTRIES", 2)
+    external = AccountLedger(account_ledger.directory)
+    account_ledger.record(account_id, models.LedgerEvent.CREATE, Decimal(1), timestamp=START)
+    for minute in range(1, 4):
+        external.record(
+            account_id, models.LedgerEvent.UPDATE, Decimal(minute + 1), timestamp=START + timedelta(minutes=minute)
+        )
+
+    entry = account_ledger.record(
+        account_id, models.LedgerEvent.UPDATE, Decimal(10), timestamp=START + timedelta(minutes=10)
+    )
+
+    segments = account_ledger._segments(account_id)
+    assert entry.amount == Decimal(6)
+    assert [len(segment.read_text().splitlines()) for segment in segments] == [3, 3, 2]
+    assert [entry.balance for entry in account_ledger.history(account_id)] == [Decimal(b) for b in (1, 2, 3, 4, 10)]
@@ -1,13 +1,16 @@
+import os
 import random
 import uuid
+from datetime import UTC, datetime
 from decimal import Decimal
 from pathlib import Path
 from tempfile import NamedTemporaryFile, TemporaryDirectory
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
 
-from src.accounts import models
+from src.accounts import bulk, models, persistance, snapshot
+from src.accounts.bulk import MAX_REPORTED_IMPORT_ERRORS
 from src.accounts.persistance import AccountPersistenceManager
 from src.common import exceptions
 from tests.accounts.factories import create_accounts_map
@@ -180,6 +183,16 @@ def test_update_username_used(manager, filepath):
         manager.update(acc_2.id, acc_2)
 
 
+def test_update_balance_only(manager):
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+
+    result = manager.update(account.id, models.Account(username="DogPool", balance=Decimal(10)))
+
+    assert result == manager.get(account.id)
+    assert result.balance == Decimal(10)
+    assert [entry.balance for entry in manager.history(account.id)] == [Decimal(42), Decimal(10)]
+
+
 def test_delete_happy_path(manager, filepath):
     accounts = create_accounts_map(10)
     with filepath.open(mode="w") as file:
@@ -202,3 +215,263 @@ def test_delete_non_existing_account(manager, filepath):
     selected_id = uuid.uuid4()
     with pytest.raises(exceptions.RecordDoesNotExist, match=f"Account with id {selected_id} does not exist"):
         manager.delete(selected_id)
+
+
+def test_iter_accounts_happy_path(manager, filepath):
+    accounts = create_accounts_map(10)
+    with filepath.open(mode="w") as file:
+        file.write(accounts.model_dump_json())
+
+    assert list(manager.iter_accounts()) == list(accounts.root.values())
+
+
+def test_bulk_create_happy_path(manager, filepath):
+    accounts = create_accounts_map(10)
+    records = [bulk.ParsedRecord(idx, account=acc) for idx, acc in enumerate(accounts.root.values(), start=1)]
+
+    report = manager.bulk_create(records, batch_size=3)
+
+    with filepath.open("r") as file:
+        saved = models.AccountsMap.model_validate_json(file.read())
+
+    assert report == models.ImportReport(batches=4, processed=10, imported=10, failed=0)
+    assert saved == accounts
+
+
+def test_bulk_create_reports_line_errors(manager, filepath):
+    existing = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    new_account = models.Account(username="Knuckles", balance=Decimal(1))
+    records = [
+        bulk.ParsedRecord(1, error="balance: Field required"),
+        bulk.ParsedRecord(2, account=models.Account(username="DogPool", balance=Decimal(1))),
+        bulk.ParsedRecord(3, account=models.Account(id=existing.id, username="FrogDoom", balance=Decimal(1))),
+        bulk.ParsedRecord(4, account=new_account),
+        bulk.ParsedRecord(5, account=models.Account(username="Knuckles", balance=Decimal(2))),
+    ]
+
+    report = manager.bulk_create(records, batch_size=2)
+
+    assert report.processed == 5
+    assert report.imported == 1
+    assert report.failed == 4
+    assert [error.line for error in report.errors] == [1, 2, 3, 5]
+    assert report.errors[0].detail == "balance: Field required"
+    assert report.errors[1].detail == "Account with username DogPool already exists."
+    assert report.errors[2].detail == f"Account with id {existing.id} already exists."
+    assert manager.list() == [existing, new_account]
+
+
+def test_bulk_create_limits_reported_errors(manager):
+    records = [bulk.ParsedRecord(idx, error="invalid") for idx in range(MAX_REPORTED_IMPORT_ERRORS + 10)]
+
+    report = manager.bulk_create(records)
+
+    assert report.failed == MAX_REPORTED_IMPORT_ERRORS + 10
+    assert len(report.errors) == MAX_REPORTED_IMPORT_ERRORS
+
+
+@pytest.fixture
+def trusted_cache(monkeypatch):
+    """Trust cache entries regardless of how recently the file was modified."""
+    monkeypatch.setattr(persistance, "RACY_WINDOW_NS", -1)
+
+
+@pytest.fixture
+def parse_spy():
+    with patch.object(models.AccountsMap, "model_validate_json", wraps=models.AccountsMap.model_validate_json) as spy:
+        yield spy
+
+
+def test_load_uses_cache_when_file_unchanged(manager, filepath, parse_spy):
+    accounts = create_accounts_map(10)
+    with filepath.open(mode="w") as file:
+        file.write(accounts.model_dump_json())
+
+    assert manager.list() == list(accounts.root.values())
+    assert manager.list() == list(accounts.root.values())
+    assert parse_spy.call_count == 1
+
+
+def test_load_returns_cached_map_without_copy(manager):
+    manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+
+    assert manager._load() is manager._load()
+
+
+def test_load_for_update_returns_copy(manager):
+    manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+
+    loaded = manager._load_for_update()
+    loaded.root.clear()
+
+    assert len(manager._load().root) == 1
+
+
+def test_save_updates_cache(manager, filepath, parse_spy):
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    parse_spy.reset_mock()
+
+    assert manager.get(account.id) == account
+    assert parse_spy.call_count == 0
+
+
+def test_save_updates_cache_under_write_traffic(manager, parse_spy):
+    manager.warm_up()
+    parse_spy.reset_mock()
+
+    for idx in range(50):
+        account = manager.create(models.Account(username=f"user_{idx}", balance=Decimal(idx)))
+        assert manager.get(account.id) == account
+        assert len(manager.list()) == idx + 1
+
+    assert parse_spy.call_count == 0
+
+
+def test_load_external_modification_size_changed(manager, filepath, trusted_cache):
+    manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    accounts = create_accounts_map(3)
+    with filepath.open(mode="w") as file:
+        file.write(accounts.model_dump_json())
+
+    assert manager.list() == list(accounts.root.values())
+
+
+def test_load_external_modification_same_size(manager, filepath, trusted_cache):
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    stat = filepath.stat()
+    changed = models.Account(id=account.id, username="DogPool", balance=Decimal(24))
+    with filepath.open(mode="w") as file:
+        file.write(models.AccountsMap({account.id: changed}).model_dump_json())
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert filepath.stat().st_size == stat.st_size
+    assert manager.get(account.id) == changed
+
+
+def test_load_external_modification_file_replaced(manager, filepath, directory, trusted_cache):
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    stat = filepath.stat()
+    changed = models.Account(id=account.id, username="DogPool", balance=Decimal(24))
+    replacement = directory / "replacement.json"
+    with replacement.open(mode="w") as file:
+        file.write(models.AccountsMap({account.id: changed}).model_dump_json())
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(replacement, filepath)
+
+    assert filepath.stat().st_mtime_ns == stat.st_mtime_ns
+    assert filepath.stat().st_size == stat.st_size
+    assert manager.get(account.id) == changed
+
+
+def test_load_external_modification_within_racy_window(manager, filepath):
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    stat = filepath.stat()
+    changed = models.Account(id=account.id, username="DogPool", balance=Decimal(24))
+    with filepath.open(mode="w") as file:
+        file.write(models.AccountsMap({account.id: changed}).model_dump_json())
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert filepath.stat().st_ino == stat.st_ino
+    assert manager.get(account.id) == changed
+
+
+def test_save_uses_configured_compression(manager, filepath):
+    manager.compression = snapshot.SnapshotCompression.GZIP
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+
+    with filepath.open("rb") as file:
+        assert file.read(2) == snapshot.GZIP_MAGIC
+
+    persistance._accounts_cache.clear()
+    assert manager.get(account.id) == account
+
+
+def test_load_detects_compression_of_existing_file(filepath):
+    accounts = create_accounts_map(10)
+    with filepath.open("wb") as file:
+        snapshot.write_snapshot(file, accounts, snapshot.SnapshotCompression.GZIP)
+
+    manager = AccountPersistenceManager(filepath, compression=snapshot.SnapshotCompression.NONE)
+
+    assert manager.list() == list(accounts.root.values())
+
+
+def test_warm_up_caches_accounts(manager, filepath):
+    accounts = create_accounts_map(10)
+    with filepath.open(mode="w") as file:
+        file.write(accounts.model_dump_json())
+
+    manager.warm_up()
+
+    assert persistance._accounts_cache[filepath].accounts == accounts
+
+
+def test_close_releases_cached_accounts(manager, filepath):
+    manager.warm_up()
+
+    manager.close()
+
+    assert filepath not in persistance._accounts_cache
+
+
+def test_history_records_balance_changes(manager):
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    manager.update(account.id, models.Account(username="FrogDoom", balance=Decimal(42)))
+    manager.update(account.id, models.Account(username="FrogDoom", balance=Decimal(10)))
+    manager.delete(account.id)
+
+    entries = list(manager.history(account.id))
+
+    assert [entry.event for entry in entries] == [
+        models.LedgerEvent.CREATE,
+        models.LedgerEvent.UPDATE,
+        models.LedgerEvent.DELETE,
+    ]
+    assert [entry.amount for entry in entries] == [Decimal(42), Decimal(-32), Decimal(-10)]
+    assert [entry.balance for entry in entries] == [Decimal(42), Decimal(10), Decimal(0)]
+    assert manager.balance_at(account.id, entries[1].timestamp) == Decimal(10)
+
+
+def test_history_non_existing_account(manager):
+    selected_id = uuid.uuid4()
+    with pytest.raises(exceptions.RecordDoesNotExist, match=f"History of account with id {selected_id}"):
+        manager.history(selected_id)
+
+
+def test_balance_at_before_account_created(manager):
+    account = manager.create(models.Account(username="DogPool", balance=Decimal(42)))
+    at = datetime(2000, 1, 1, tzinfo=UTC)
+
+    with pytest.raises(exceptions.RecordDoesNotExist):
+        manager.balance_at(account.id, at)
+
+
+def test_bulk_create_does_not_write_ledger(manager):
+    accounts = create_accounts_map(3)
+    records = [bulk.ParsedRecord(idx, account=acc) for idx, acc in enumerate(accounts.root.values(), start=1)]
+
+    manager.bulk_create(records)
+
+    assert not manager.ledger.directory.exists()
+    account = next(iter(accounts.root.values()))
+    assert list(manager.history(account.id)) == []
+    assert manager.balance_at(account.id, datetime.now(UTC)) == account.balance
+
+    manager.update(account.id, models.Account(username=account.username, balance=account.balance + 5))
+
+    [entry] = manager.history(account.id)
+    assert entry.event is models.LedgerEvent.UPDATE
+    assert entry.amount == Decimal(5)
+    assert entry.balance == account.balance + 5
+
+
+def test_balance_at_account_without_ledger(manager, filepath):
+    accounts = create_accounts_map(3)
+    with filepath.open(mode="w") as file:
+        file.write(accounts.model_dump_json())
+    account = next(iter(accounts.root.values()))
+
+    assert manager.balance_at(account.id, datetime.now(UTC)) == account.balance
+    assert list(manager.history(account.id)) == []
+    with pytest.raises(exceptions.RecordDoesNotExist):
+        manager.balance_at(uuid.uuid4(), datetime.now(UTC))
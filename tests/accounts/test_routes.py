@@ -1,13 +1,17 @@
+from datetime import UTC, datetime
 from decimal import Decimal
 from unittest.mock import Mock
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
 
-from src.accounts import models, schema
+from src.accounts import models, persistance, schema
 from src.accounts.persistance import AccountPersistenceManager
-from src.accounts.routes import get_account_persistence_manger
+from src.accounts.routes import get_account_persistence_manger, get_idempotency_cache
 from src.common import exceptions
+from src.common.idempotency import IdempotencyCache
 from src.main import app
 from tests.accounts.factories import create_accounts_map
 
@@ -24,6 +28,14 @@ def override_persistence_manger():
     app.dependency_overrides = {}
 
 
+@pytest.fixture(autouse=True)
+def override_idempotency_cache():
+    cache = IdempotencyCache(cacheable_errors=(HTTPException,))
+    app.dependency_overrides[get_idempotency_cache] = lambda: cache
+    yield cache
+    app.dependency_overrides.pop(get_idempotency_cache, None)
+
+
 @pytest.fixture
 def account():
     return models.Account(username="DogPool", balance=Decimal("42"))
@@ -190,3 +202,253 @@ def test_delete_account_by_id_account_not_found(client, override_persistence_man
     assert response.status_code == 404
     assert response.json()["detail"] == "Account not found"
     override_persistence_manger.delete.assert_called_once_with(account.id)
+
+
+def test_export_accounts_ndjson(client, override_persistence_manger):
+    accounts = create_accounts_map()
+    override_persistence_manger.iter_accounts.return_value = iter(accounts.root.values())
+
+    response = client.get("/api/v1/accounts/export/")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [models.Account.model_validate_json(line) for line in lines] == list(accounts.root.values())
+
+
+def test_export_accounts_csv(client, override_persistence_manger):
+    accounts = create_accounts_map()
+    override_persistence_manger.iter_accounts.return_value = iter(accounts.root.values())
+
+    response = client.get("/api/v1/accounts/export/", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines()[0] == "id,username,balance"
+    assert len(response.text.splitlines()) == len(accounts.root) + 1
+
+
+def test_import_accounts_happy_path(client, override_persistence_manger, account):
+    report = models.ImportReport(
+        processed=2, imported=1, failed=1, errors=[models.ImportLineError(line=2, detail="invalid")]
+    )
+    received = []
+
+    def bulk_create(records):
+        received.extend(records)
+        return report
+
+    override_persistence_manger.bulk_create.side_effect = bulk_create
+    content = account.model_dump_json() + "\nnot json\n"
+
+    response = client.post("/api/v1/accounts/import/", files={"file": ("accounts.ndjson", content)})
+
+    assert response.status_code == 200
+    assert response.json() == report.model_dump(mode="json")
+    assert received[0].account == account
+    assert received[1].line == 2
+    assert received[1].error
+
+
+def test_import_accounts_csv(client, override_persistence_manger):
+    received = []
+
+    def bulk_create(records):
+        received.extend(records)
+        return models.ImportReport(processed=len(received), imported=len(received))
+
+    override_persistence_manger.bulk_create.side_effect = bulk_create
+    content = "username,balance\nDogPool,42\nKnuckles,7\n"
+
+    response = client.post(
+        "/api/v1/accounts/import/", params={"format": "csv"}, files={"file": ("accounts.csv", content)}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+    assert [record.account.username for record in received] == ["DogPool", "Knuckles"]
+
+
+def test_persistence_manager_created_once_in_lifespan(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+    with TestClient(app) as client:
+        manager = app.state.account_persistence_manager
+        first = client.post("/api/v1/accounts/", json={"username": "DogPool", "balance": "42"})
+        second = client.get(f"/api/v1/accounts/{first.json()['id']}/")
+
+        assert first.status_code == 201
+        assert second.json() == first.json()
+        assert app.state.account_persistence_manager is manager
+        assert manager.filepath == tmp_path / "data" / "accounts.json"
+
+    assert manager.filepath not in persistance._accounts_cache
+
+
+def test_get_account_history_happy_path(client, override_persistence_manger, account):
+    entries = [
+        models.LedgerEntry(
+            timestamp=datetime(2025, 1, 1, tzinfo=UTC), event="create", amount=Decimal(42), balance=Decimal(42)
+        ),
+        models.LedgerEntry(
+            timestamp=datetime(2025, 1, 2, tzinfo=UTC), event="update", amount=Decimal(-2), balance=Decimal(40)
+        ),
+    ]
+    override_persistence_manger.history.return_value = iter(entries)
+
+    response = client.get(
+        f"/api/v1/accounts/{account.id}/history/", params={"from": "2025-01-01T00:00:00", "to": "2025-01-03T00:00:00Z"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["account_id"] == str(account.id)
+    assert [Decimal(entry["balance"]) for entry in response.json()["entries"]] == [Decimal(42), Decimal(40)]
+    override_persistence_manger.history.assert_called_once_with(
+        account.id, datetime(2025, 1, 1, tzinfo=UTC), datetime(2025, 1, 3, tzinfo=UTC)
+    )
+
+
+def test_get_account_history_not_found(client, override_persistence_manger, account):
+    override_persistence_manger.history.side_effect = exceptions.RecordDoesNotExist()
+
+    response = client.get(f"/api/v1/accounts/{account.id}/history/")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Account history not found"
+    override_persistence_manger.history.assert_called_once_with(account.id, None, None)
+
+
+def test_get_account_balance_at_happy_path(client, override_persistence_manger, account):
+    override_persistence_manger.balance_at.return_value = Decimal(42)
+
+    response = client.get(f"/api/v1/accounts/{account.id}/balance/", params={"at": "2025-01-01T12:00:00Z"})
+
+    assert response.status_code == 200
+    assert Decimal(response.json()["balance"]) == Decimal(42)
+    override_persistence_manger.balance_at.assert_called_once_with(account.id, datetime(2025, 1, 1, 12, tzinfo=UTC))
+
+
+def test_get_account_balance_at_not_found(client, override_persistence_manger, account):
+    override_persistence_manger.balance_at.side_effect = exceptions.RecordDoesNotExist()
+
+    response = client.get(f"/api/v1/accounts/{account.id}/balance/")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Account balance not found"
+
+
+def test_create_account_idempotency_key_replayed(
+    client, override_persistence_manger, override_idempotency_cache, account
+):
+    override_persistence_manger.create.return_value = account
+    headers = {"Idempotency-Key": "create-dog-pool"}
+    payload = {"username": account.username, "balance": str(account.balance)}
+
+    first = client.post("/api/v1/accounts/", json=payload, headers=headers)
+    second = client.post("/api/v1/accounts/", json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert first.json() == second.json() == account.model_dump(mode="json")
+    override_persistence_manger.create.assert_called_once()
+
+
+def test_create_account_idempotency_key_replays_error(
+    client, override_persistence_manger, override_idempotency_cache, account
+):
+    override_persistence_manger.create.side_effect = exceptions.RecordAlreadyExists("Account already exists.")
+    headers = {"Idempotency-Key": "create-dog-pool"}
+    payload = {"username": account.username, "balance": str(account.balance)}
+
+    first = client.post("/api/v1/accounts/", json=payload, headers=headers)
+    second = client.post("/api/v1/accounts/", json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 409
+    assert second.json()["detail"] == "Account already exists."
+    override_persistence_manger.create.assert_called_once()
+
+
+def test_create_account_idempotency_key_reused(
+    client, override_persistence_manger, override_idempotency_cache, account
+):
+    override_persistence_manger.create.return_value = account
+    headers = {"Idempotency-Key": "create-dog-pool"}
+
+    client.post("/api/v1/accounts/", json={"username": "DogPool", "balance": "42"}, headers=headers)
+    response = client.post("/api/v1/accounts/", json={"username": "Knuckles", "balance": "42"}, headers=headers)
+
+    assert response.status_code == 422
+    override_persistence_manger.create.assert_called_once()
+
+
+def test_create_account_without_idempotency_key(
+    client, override_persistence_manger, override_idempotency_cache, account
+):
+    override_persistence_manger.create.return_value = account
+    payload = {"username": account.username, "balance": str(account.balance)}
+
+    client.post("/api/v1/accounts/", json=payload)
+    client.post("/api/v1/accounts/", json=payload)
+
+    assert override_persistence_manger.create.call_count == 2
+    assert len(override_idempotency_cache) == 0
+
+
+def test_update_account_idempotency_key_replayed(
+    client, override_persistence_manger, override_idempotency_cache, account
+):
+    result = models.Account(id=account.id, username=account.username, balance=Decimal(10))
+    override_persistence_manger.get.return_value = account
+    override_persistence_manger.update.return_value = result
+    headers = {"Idempotency-Key": "update-dog-pool"}
+
+    first = client.patch(f"/api/v1/accounts/{account.id}/", json={"balance": "10"}, headers=headers)
+    second = client.patch(f"/api/v1/accounts/{account.id}/", json={"balance": "10"}, headers=headers)
+
+    assert first.json() == second.json() == result.model_dump(mode="json")
+    override_persistence_manger.get.assert_called_once_with(account.id)
+    override_persistence_manger.update.assert_called_once()
+
+
+def test_idempotency_key_scoped_to_endpoint(client, override_persistence_manger, override_idempotency_cache, account):
+    override_persistence_manger.get.return_value = account
+    override_persistence_manger.update.return_value = account
+    headers = {"Idempotency-Key": "shared-key"}
+
+    client.patch(f"/api/v1/accounts/{account.id}/", json={"balance": "10"}, headers=headers)
+    client.patch(f"/api/v1/accounts/{uuid4()}/", json={"balance": "10"}, headers=headers)
+
+    assert override_persistence_manger.update.call_count == 2
+
+
+def test_update_account_by_id_username_already_exists(client, override_persistence_manger, account):
+    error_msg = "Account with username HamsterQuad already exists."
+    override_persistence_manger.get.return_value = account
+    override_persistence_manger.update.side_effect = exceptions.RecordAlreadyExists(error_msg)
+
+    response = client.patch(f"/api/v1/accounts/{account.id}/", json={"username": "HamsterQuad"})
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == error_msg
+
+
+def test_replace_account_username_already_exists(client, override_persistence_manger, account):
+    error_msg = "Account with username DogPool already exists."
+    override_persistence_manger.update.side_effect = exceptions.RecordAlreadyExists(error_msg)
+
+    response = client.put(f"/api/v1/accounts/{account.id}/", json=account.model_dump(mode="json"))
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == error_msg
+
+
+def test_update_account_balance_only_end_to_end(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+    with TestClient(app) as client:
+        created = client.post("/api/v1/accounts/", json={"username": "DogPool", "balance": "42"}).json()
+        response = client.patch(f"/api/v1/accounts/{created['id']}/", json={"balance": "10"})
+        history = client.get(f"/api/v1/accounts/{created['id']}/history/")
+
+    assert response.status_code == 200
+    assert Decimal(response.json()["balance"]) == Decimal(10)
+    assert [entry["event"] for entry in history.json()["entries"]] == ["create", "update"]
@@ -0,0 +1,58 @@
+import gzip
+import io
+
+import pytest
+
+from src.accounts import models, snapshot
+from tests.accounts.factories import create_accounts_map
+
+COMPRESSIONS = [
+    snapshot.SnapshotCompression.NONE,
+    snapshot.SnapshotCompression.GZIP,
+    pytest.param(
+        snapshot.SnapshotCompression.ZSTD,
+        marks=pytest.mark.skipif(snapshot.zstandard is None, reason="zstandard is not installed"),
+    ),
+]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("count", [0, 1, 2500])
+def test_snapshot_round_trip(compression, count):
+    accounts = create_accounts_map(count)
+    buffer = io.BytesIO()
+
+    snapshot.write_snapshot(buffer, accounts, compression)
+    buffer.seek(0)
+
+    assert snapshot.detect_compression(buffer.getvalue()) is compression
+    assert snapshot.read_snapshot(buffer) == accounts
+
+
+def test_gzip_snapshot_is_ndjson():
+    accounts = create_accounts_map(3)
+    buffer = io.BytesIO()
+
+    snapshot.write_snapshot(buffer, accounts, snapshot.SnapshotCompression.GZIP)
+
+    lines = gzip.decompress(buffer.getvalue()).splitlines()
+    assert [models.Account.model_validate_json(line) for line in lines] == list(accounts.root.values())
+
+
+def test_read_snapshot_legacy_plain_json():
+    accounts = create_accounts_map(3)
+
+    assert snapshot.read_snapshot(io.BytesIO(accounts.model_dump_json().encode())) == accounts
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (b"\x1f\x8b\x08\x00", snapshot.SnapshotCompression.GZIP),
+        (b"\x28\xb5\x2f\xfd", snapshot.SnapshotCompression.ZSTD),
+        (b"{}", snapshot.SnapshotCompression.NONE),
+        (b"", snapshot.SnapshotCompression.NONE),
+    ],
+)
+def test_detect_compression(header, expected):
+    assert snapshot.detect_compression(header) is expected
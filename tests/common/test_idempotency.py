@@ -0,0 +1,174 @@
+import threading
+import traceback
+from unittest.mock import Mock
+
+import pytest
+
+from src.common import exceptions
+from src.common.idempotency import IdempotencyCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(clock):
+    return IdempotencyCache(max_size=3, ttl=60, wait_timeout=5, cacheable_errors=(ValueError,), clock=clock)
+
+
+def test_run_returns_stored_result(cache):
+    func = Mock(return_value="created")
+
+    assert cache.run("key", "payload", func) == "created"
+    assert cache.run("key", "payload", func) == "created"
+    func.assert_called_once_with()
+
+
+def test_run_different_keys_executed_separately(cache):
+    func = Mock(side_effect=["first", "second"])
+
+    assert cache.run("key_1", "payload", func) == "first"
+    assert cache.run("key_2", "payload", func) == "second"
+
+
+def test_run_key_reused_with_different_payload(cache):
+    cache.run("key", "payload", Mock(return_value="created"))
+
+    with pytest.raises(exceptions.IdempotencyKeyReused):
+        cache.run("key", "other payload", Mock())
+
+
+def test_run_stores_cacheable_errors(cache):
+    func = Mock(side_effect=ValueError("conflict"))
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="conflict"):
+            cache.run("key", "payload", func)
+    func.assert_called_once_with()
+
+
+def test_run_does_not_store_other_errors(cache):
+    func = Mock(side_effect=[RuntimeError("failed"), "created"])
+
+    with pytest.raises(RuntimeError):
+        cache.run("key", "payload", func)
+
+    assert cache.run("key", "payload", func) == "created"
+    assert func.call_count == 2
+
+
+def test_run_entries_expire(cache, clock):
+    func = Mock(side_effect=["first", "second"])
+
+    assert cache.run("key", "payload", func) == "first"
+    clock.now += 61
+    assert cache.run("key", "payload", func) == "second"
+
+
+def test_run_evicts_oldest_entries(cache):
+    func = Mock(side_effect=lambda: func.call_count)
+
+    for idx in range(5):
+        cache.run(f"key_{idx}", "payload", func)
+
+    assert len(cache) == 3
+    assert cache.run("key_4", "payload", func) == 5
+    assert cache.run("key_0", "payload", func) == 6
+
+
+def test_run_concurrent_duplicates_wait_for_first(cache):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "created"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.run("key", "payload", func)))
+    first.start()
+    started.wait(timeout=5)
+    duplicates = [threading.Thread(target=lambda: results.append(cache.run("key", "payload", func))) for _ in range(3)]
+    for thread in duplicates:
+        thread.start()
+    release.set()
+    for thread in [first, *duplicates]:
+        thread.join(timeout=5)
+
+    assert results == ["created"] * 4
+    assert len(calls) == 1
+
+
+def test_run_wait_timeout(clock):
+    cache = IdempotencyCache(wait_timeout=0.01, clock=clock)
+    release = threading.Event()
+    started = threading.Event()
+
+    def func():
+        started.set()
+        release.wait(timeout=5)
+
+    thread = threading.Thread(target=cache.run, args=("key", "payload", func))
+    thread.start()
+    started.wait(timeout=5)
+    try:
+        with pytest.raises(exceptions.IdempotencyKeyInProgress):
+            cache.run("key", "payload", func)
+    finally:
+        release.set()
+        thread.join(timeout=5)
+
+
+def test_run_replayed_error_does_not_grow_traceback(cache):
+    func = Mock(side_effect=ValueError("conflict"))
+    errors = []
+
+    for _ in range(5):
+        with pytest.raises(ValueError) as exc_info:
+            cache.run("key", "payload", func)
+        errors.append(exc_info.value)
+
+    frames = [len(traceback.extract_tb(err.__traceback__)) for err in errors[1:]]
+    assert len(set(frames)) == 1
+    assert len({id(err) for err in errors}) == len(errors)
+    func.assert_called_once_with()
+
+
+def test_run_does_not_evict_requests_in_progress(clock):
+    cache = IdempotencyCache(max_size=1, wait_timeout=5, clock=clock)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "created"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.run("key", "payload", slow)))
+    first.start()
+    started.wait(timeout=5)
+    cache.run("other_key", "payload", Mock(return_value="other"))
+    duplicate = threading.Thread(target=lambda: results.append(cache.run("key", "payload", slow)))
+    duplicate.start()
+    release.set()
+    for thread in [first, duplicate]:
+        thread.join(timeout=5)
+
+    assert results == ["created", "created"]
+    assert len(calls) == 1